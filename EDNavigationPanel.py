@@ -3,11 +3,16 @@ from __future__ import annotations
 import json
 import logging
 import os
+import re
+import struct
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from copy import copy
-from time import sleep
+from time import sleep, monotonic
 
 import cv2
 import numpy as np
+import xxhash
 
 from EDAP_data import GuiFocusExternalPanel
 from EDlogger import logger
@@ -24,6 +29,50 @@ Description:
 Author: Stumpii
 """
 
+# Max number of OCR results kept in each of the Nav Panel OCR caches
+OCR_CACHE_SIZE = 32
+# Mean absolute pixel difference (0-255) below which two location panel images are considered unchanged
+LOC_PANEL_DIFF_THRESH = 5.0
+# Minimum time the selected list item must stay the same before scroll_to_top_of_list or _press_until_stable
+# treat it as the end of the list. Checks are faster than the UI_Up key repeat (unchanged frames skip the OCR),
+# so counting checks is not enough.
+SCROLL_TOP_STABLE_TIME = 0.5
+# Time for the panel opening animation to settle after the GUI focus changes. The focus changes as the panel
+# starts to open, and OCR of a half drawn tab bar causes a wrong tab change.
+PANEL_SETTLE_TIME = 0.3
+
+
+def image_cache_key(image, *params) -> bytes:
+    """ Returns a fast content hash of an image, used as the key to cache OCR results. Hashing an image
+    takes well under 1 mS, compared to 50-250 mS to OCR it.
+    @param image: The image to hash.
+    @param params: Any additional (float) values that affect the result of processing the image.
+    @return: The key as bytes.
+    """
+    shape_and_params = struct.pack(f"{image.ndim}i{len(params)}f", *image.shape, *params)
+    # Hash the image buffer directly. Only a cropped (non-contiguous) image needs to be copied first.
+    return xxhash.xxh3_128(np.ascontiguousarray(image)).digest() + shape_and_params
+
+
+def lru_cache_get(cache: OrderedDict, key: bytes, func, max_size: int = OCR_CACHE_SIZE):
+    """ Gets the value for the key from the cache. If not in the cache, the value is calculated
+    by calling 'func' and added to the cache, removing the oldest value if the cache is full.
+    @param cache: The cache to use.
+    @param key: The key of the value.
+    @param func: Function called with no arguments to calculate the value if not in the cache.
+    @param max_size: The maximum size of the cache.
+    @return: The cached or calculated value.
+    """
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    value = func()
+    cache[key] = value
+    if len(cache) > max_size:
+        cache.popitem(last=False)
+    return value
+
 
 def image_perspective_transform(image, src_quad: Quad):
     """ Performs warping of the nav panel image and returns the resulting image.
@@ -121,6 +170,14 @@ class EDNavigationPanel:
         self.transactions_tab_text = self.locale["NAV_PNL_TAB_TRANSACTIONS"]
         self.contacts_tab_text = self.locale["NAV_PNL_TAB_CONTACTS"]
         self.target_tab_text = self.locale["NAV_PNL_TAB_TARGET"]
+        # Lookup of lowercase tab text to the tab text above, and a pattern to find any of the lowercase tab texts
+        # in a single pass. Longest text first, so the longest match wins when texts overlap.
+        self._tab_texts = {}
+        for tab_text in (self.navigation_tab_text, self.transactions_tab_text, self.contacts_tab_text,
+                         self.target_tab_text):
+            self._tab_texts.setdefault(tab_text.lower(), tab_text)
+        self._tab_text_re = re.compile("|".join(re.escape(t) for t in sorted(self._tab_texts, key=len, reverse=True)
+                                                if t))
 
         # The rect is [L, T, R, B], top left x, y, and bottom right x, y in fraction of screen resolution
         # Nav Panel region covers the entire navigation panel.
@@ -136,6 +193,11 @@ class EDNavigationPanel:
         self.panel = None
         self._transform = None  # Warp transform to deskew the Nav panel
         self._rev_transform = None  # Reverse warp transform to skew to match the Nav panel
+        self._tab_ocr_cache: OrderedDict[bytes, tuple] = OrderedDict()  # Tab bar OCR results by image hash
+        self._loc_ocr_cache: OrderedDict[bytes, tuple] = OrderedDict()  # Location panel OCR results by image hash
+        self._last_loc_img = None  # Downsampled copy of the last location panel checked for changes
+        # Worker to grab the next panel image while the current one is OCR'd
+        self._capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='NavPanelCapture')
 
         self.load_calibrated_regions()
 
@@ -157,8 +219,22 @@ class EDNavigationPanel:
             self.panel_quad_pix = copy(self.panel_quad_pct)
             self.panel_quad_pix.scale_from_origin(self.ap.scr.screen_width, self.ap.scr.screen_height)
 
-    def capture_panel_straightened(self):
+    def grab_panel_image(self, reuse_buffer=False):
+        """ Grab the (unstraightened) screen image of the panel coordinates. This is only a screen grab, with
+        no shared state changed, so it is safe to run in a worker thread (see scroll_to_top_of_list).
+        @param reuse_buffer: Reuse the screen capture buffer. Only when the image is not used after the next grab.
+        Returns the image, or None if calibration has not been performed.
+        """
+        if self.panel_quad_pct is None:
+            return None
+
+        return self.screen.get_screen(self.panel_quad_pix.get_left(), self.panel_quad_pix.get_top(),
+                                      self.panel_quad_pix.get_right(), self.panel_quad_pix.get_bottom(), rgb=False,
+                                      reuse_buffer=reuse_buffer)
+
+    def capture_panel_straightened(self, image=None):
         """ Grab the image based on the panel coordinates.
+        @param image: The image from grab_panel_image to use, else the screen is grabbed.
         Returns an unfiltered image, either from screenshot or provided image, or None if an image cannot
         be grabbed.
         """
@@ -167,9 +243,10 @@ class EDNavigationPanel:
             self.ap_ckb('log', 'Nav Panel Calibration has not been performed. Cannot continue.')
             return None
 
-        # Get the nav panel image based on the region
-        image = self.screen.get_screen(self.panel_quad_pix.get_left(), self.panel_quad_pix.get_top(),
-                                       self.panel_quad_pix.get_right(), self.panel_quad_pix.get_bottom(), rgb=False)
+        # Get the nav panel image based on the region. The image is only used to produce the straightened
+        # image, so the capture buffer can be reused.
+        if image is None:
+            image = self.grab_panel_image(reuse_buffer=True)
         cv2.imwrite(f'test/nav-panel/out/nav_panel_original.png', image)
 
         # Offset the panel co-ords to match the cropped image (i.e. starting at 0,0)
@@ -216,12 +293,13 @@ class EDNavigationPanel:
 
         return tab_bar
 
-    def capture_location_panel(self):
+    def capture_location_panel(self, image=None):
         """ Get the location panel from within the nav panel.
+        @param image: The image from grab_panel_image to use, else the screen is grabbed.
         Returns an image, or None.
         """
         # Scale the regions based on the target resolution.
-        nav_panel = self.capture_panel_straightened()
+        nav_panel = self.capture_panel_straightened(image)
         if nav_panel is None:
             return None
 
@@ -242,6 +320,89 @@ class EDNavigationPanel:
 
         return location_panel
 
+    def get_tab_bar_item_data(self, tab_bar):
+        """ Get the highlighted item OCR text of the tab bar. The result is cached by the image contents, so
+        an unchanged tab bar is not OCR'd again.
+        Returns the OCR text list and the item Quad, or (None, None).
+        """
+        min_w = self.sub_reg_size['nav_pnl_tab']['width']
+        min_h = self.sub_reg_size['nav_pnl_tab']['height']
+
+        def ocr_tab_bar_item():
+            _, _, ocr_textlist, quad = self.ocr.get_highlighted_item_data(tab_bar, min_w, min_h, 'nav panel')
+            return ocr_textlist, quad
+
+        key = image_cache_key(tab_bar, min_w, min_h)
+        return lru_cache_get(self._tab_ocr_cache, key, ocr_tab_bar_item)
+
+    def get_location_item_data(self, loc_panel):
+        """ Get the highlighted item of the location panel and OCR it. The result is cached by the image
+        contents, so an unchanged location panel is not OCR'd again.
+        Returns the selected item image, the item Quad and the OCR text list, or (None, None, None).
+        """
+        min_w = self.sub_reg_size['nav_pnl_location']['width']
+        min_h = self.sub_reg_size['nav_pnl_location']['height']
+
+        def ocr_location_item():
+            img_selected, quad = self.ocr.get_highlighted_item_in_image(loc_panel, min_w, min_h)
+            ocr_textlist = self.ocr.image_simple_ocr(img_selected)
+            return img_selected, quad, ocr_textlist
+
+        key = image_cache_key(loc_panel, min_w, min_h)
+        return lru_cache_get(self._loc_ocr_cache, key, ocr_location_item)
+
+    def is_location_panel_unchanged(self, loc_panel) -> bool:
+        """ Compares the location panel image with the previous image passed to this function, using the mean
+        absolute difference of 64x64 downsampled copies. This is far cheaper than OCR'ing the panel.
+        Returns True if the panel has not visibly changed, else False.
+        """
+        small = cv2.resize(loc_panel, (64, 64), interpolation=cv2.INTER_AREA)
+        last = self._last_loc_img
+        self._last_loc_img = small
+        if last is None or last.shape != small.shape:
+            return False
+
+        err = np.mean(cv2.absdiff(small, last))
+        return err < LOC_PANEL_DIFF_THRESH
+
+    def _press_until_stable(self, key='UI_Up', max_time=4.0, poll=0.2) -> bool:
+        """ Holds a key until the location panel stops changing (i.e. the selection has reached the top or
+        bottom of the list), instead of holding the key for a fixed time.
+        @param key: The key binding to hold.
+        @param max_time: The maximum time to hold the key in seconds.
+        @param poll: The time between checks of the location panel in seconds.
+        @return: True if the panel stopped changing, False if the max time was reached or the panel closed.
+        """
+        stable_since = None  # When the panel was first seen unchanged, or None while it is changing
+        self._last_loc_img = None
+        end_time = monotonic() + max_time
+        self.keys.send(key, state=1)
+        try:
+            while monotonic() < end_time:
+                sleep(poll)
+
+                # Check the panel is still open before the capture
+                if self.status_parser.get_gui_focus() != GuiFocusExternalPanel:
+                    return False
+
+                loc_panel = self.capture_location_panel()
+                if loc_panel is None:
+                    return False
+
+                # Require the panel to stay unchanged for longer than the key repeat delay, so a pause between
+                # rows (or repetitive rows) is not taken as the end of the list
+                if self.is_location_panel_unchanged(loc_panel):
+                    if stable_since is None:
+                        stable_since = monotonic()
+                    elif monotonic() - stable_since >= SCROLL_TOP_STABLE_TIME:
+                        return True
+                else:
+                    stable_since = None
+
+            return False
+        finally:
+            self.keys.send(key, state=0)
+
     def show_panel(self):
         """ Shows the Nav Panel. Opens the Nav Panel if not already open.
         Returns True if successful, else False.
@@ -261,7 +422,9 @@ class EDNavigationPanel:
             self.keys.send('UIFocus', state=1)
             self.keys.send('UI_Left')
             self.keys.send('UIFocus', state=0)
-            sleep(0.5)
+            # Poll often, as the panel usually opens in well under a second
+            if self.status_parser.wait_for_gui_focus(GuiFocusExternalPanel, timeout=1.0, poll=0.05):
+                sleep(PANEL_SETTLE_TIME)
 
             # Check if it opened
             active, active_tab_name = self.is_panel_active()
@@ -292,16 +455,22 @@ class EDNavigationPanel:
         # Try this 'n' times before giving up
         tab_text = ""
         for i in range(10):
+            # Check the panel is still open before the (expensive) capture and OCR
+            if self.status_parser.get_gui_focus() != GuiFocusExternalPanel:
+                logger.debug("is_nav_panel_active: right panel no longer focused")
+                return False, ""
+
             # Is open, so proceed
             tab_bar = self.capture_tab_bar()
             if tab_bar is None:
                 return False, ""
 
-            img_selected, _, ocr_textlist, quad = self.ocr.get_highlighted_item_data(tab_bar, self.sub_reg_size['nav_pnl_tab']['width'], self.sub_reg_size['nav_pnl_tab']['height'], 'nav panel')
-            if img_selected is not None:
+            ocr_textlist, quad = self.get_tab_bar_item_data(tab_bar)
+            if ocr_textlist is not None:
                 if self.ap.debug_overlay:
                     tab_bar_quad = Quad.from_rect(self.sub_reg['tab_bar']['rect'])
-                    # Convert to a percentage of the nav panel
+                    # Convert to a percentage of the nav panel. Copy, as the quad may be cached.
+                    quad = copy(quad)
                     quad.scale_from_origin(tab_bar_quad.get_width(), tab_bar_quad.get_height())
                     # quad.offset(tab_bar_quad.get_left(), tab_bar_quad.get_top())
 
@@ -315,18 +484,12 @@ class EDNavigationPanel:
                     self.ap.overlay.overlay_quad_pix('nav_panel_item', q_out, (0, 255, 0), 2)
                     self.ap.overlay.overlay_paint()
 
-                # Test OCR string
-                if self.navigation_tab_text in str(ocr_textlist):
-                    tab_text = self.navigation_tab_text
-                    break
-                if self.transactions_tab_text in str(ocr_textlist):
-                    tab_text = self.transactions_tab_text
-                    break
-                if self.contacts_tab_text in str(ocr_textlist):
-                    tab_text = self.contacts_tab_text
-                    break
-                if self.target_tab_text in str(ocr_textlist):
-                    tab_text = self.target_tab_text
+                # Test OCR text for any of the tab texts. Join the text once, so the search does not include the
+                # brackets and quotes of the list repr.
+                ocr_text = " ".join(ocr_textlist).lower() if ocr_textlist else ""
+                match = self._tab_text_re.search(ocr_text)
+                if match:
+                    tab_text = self._tab_texts[match.group(0)]
                     break
 
             # Wait and retry
@@ -426,10 +589,10 @@ class EDNavigationPanel:
             print("Contacts Panel could not be opened")
             return False
 
-        # On the CONTACT TAB, go to top selection, do this 4 seconds to ensure at top
+        # On the CONTACT TAB, go to top selection, hold up until the selection stops moving (max 2 seconds)
         # then go right, which will be "REQUEST DOCKING" and select it
         self.keys.send("UI_Down")  # go down
-        self.keys.send('UI_Up', hold=2)  # got to top row
+        self._press_until_stable('UI_Up', max_time=2.0)  # got to top row
         self.keys.send('UI_Right')
         self.keys.send('UI_Select')
         sleep(0.3)
@@ -446,37 +609,57 @@ class EDNavigationPanel:
 
         ocr_textlist_last = ""
         tries = 0
+        stable_since = monotonic()  # When the selected item text last changed
         in_list = False  # Have we seen one item yet? Prevents quiting if we have not selected the first item.
-        while 1:
-            # Get the location panel image
-            loc_panel = self.capture_location_panel()
-            if loc_panel is None:
-                return None
-
-            # Find the selected item/menu (solid orange)
-            img_selected, q = self.ocr.get_highlighted_item_in_image(loc_panel, self.sub_reg_size['nav_pnl_location']['width'], self.sub_reg_size['nav_pnl_location']['height'])
-
-            # Check if end of list.
-            if img_selected is None and in_list:
-                #logger.debug(f"Off end of list. Did not find '{dst_name}' in list.")
-                self.keys.send("UI_Up", state=0)  # got to top row
-                return False
-
-            # OCR the selected item
-            ocr_textlist = self.ocr.image_simple_ocr(img_selected)
-            if ocr_textlist is not None:
-                # Check if list has not changed (we are at the top)
-                if ocr_textlist == ocr_textlist_last:
-                    tries = tries + 1
-                else:
-                    tries = 0
-                    ocr_textlist_last = ocr_textlist
-
-                # Require some counts in case we hit multiple 'UNIDENTIFIED SIGNAL SOURCE',
-                # 'CONFLICT ZONE' or other repetitive text
-                if tries >= 3:
+        self._last_loc_img = None
+        item_data = None
+        # The screen grab of the next panel image runs in the worker while the current one is OCR'd. The worker
+        # only grabs the screen (mss is thread safe, and only one grab runs at a time). The straightening, which
+        # sets the panel transforms, and the debug overlay are done here on the calling thread. The buffer is not
+        # reused, as the next grab runs while this image is processed.
+        future = self._capture_pool.submit(self.grab_panel_image)
+        try:
+            while 1:
+                # Check the panel is still open before the (expensive) capture and OCR
+                if self.status_parser.get_gui_focus() != GuiFocusExternalPanel:
+                    self.keys.send("UI_Up", state=0)
+                    return None
+
+                # Get the panel image and start grabbing the next one
+                image = future.result()
+                future = self._capture_pool.submit(self.grab_panel_image)
+                loc_panel = self.capture_location_panel(image)
+                if loc_panel is None:
+                    return None
+
+                # Find the selected item/menu (solid orange) and OCR it, unless the panel has not visibly changed
+                if not self.is_location_panel_unchanged(loc_panel) or item_data is None:
+                    item_data = self.get_location_item_data(loc_panel)
+                img_selected, q, ocr_textlist = item_data
+
+                # Check if end of list.
+                if img_selected is None and in_list:
+                    #logger.debug(f"Off end of list. Did not find '{dst_name}' in list.")
                     self.keys.send("UI_Up", state=0)  # got to top row
-                    return True
+                    return False
+
+                if ocr_textlist is not None:
+                    # Check if list has not changed (we are at the top)
+                    if ocr_textlist == ocr_textlist_last:
+                        tries = tries + 1
+                    else:
+                        tries = 0
+                        ocr_textlist_last = ocr_textlist
+                        stable_since = monotonic()
+
+                    # Require some counts and a minimum time unchanged, in case we hit multiple
+                    # 'UNIDENTIFIED SIGNAL SOURCE', 'CONFLICT ZONE' or other repetitive text
+                    if tries >= 3 and monotonic() - stable_since >= SCROLL_TOP_STABLE_TIME:
+                        self.keys.send("UI_Up", state=0)  # got to top row
+                        return True
+        finally:
+            # Let the capture in progress finish, so it does not overlap the caller's next capture
+            wait([future])
 
     def find_destination_in_list(self, dst_name) -> bool:
         # tries is the number of rows to go through to find the item looking for
@@ -492,13 +675,18 @@ class EDNavigationPanel:
         y_last = -1
         in_list = False  # Have we seen one item yet? Prevents quiting if we have not selected the first item.
         while 1:
+            # Check the panel is still open before the (expensive) capture and OCR
+            if self.status_parser.get_gui_focus() != GuiFocusExternalPanel:
+                logger.debug(f"Nav Panel closed. Did not find '{dst_name}' in list.")
+                return False
+
             # Get the location panel image
             loc_panel = self.capture_location_panel()
             if loc_panel is None:
                 return False
 
-            # Find the selected item/menu (solid orange)
-            img_selected, quad = self.ocr.get_highlighted_item_in_image(loc_panel, self.sub_reg_size['nav_pnl_location']['width'], self.sub_reg_size['nav_pnl_location']['height'])
+            # Find the selected item/menu (solid orange) and OCR it
+            img_selected, quad, ocr_textlist = self.get_location_item_data(loc_panel)
             # Check if end of list.
             if img_selected is None and in_list:
                 logger.debug(f"Off end of list. Did not find '{dst_name}' in list.")
@@ -529,9 +717,8 @@ class EDNavigationPanel:
             else:
                 y_last = quad.get_top()
 
-            # OCR the selected item
+            # Check the OCR of the selected item
             sim_match = 0.8  # Similarity match 0.0 - 1.0 for 0% - 100%)
-            ocr_textlist = self.ocr.image_simple_ocr(img_selected)
             if ocr_textlist is not None:
                 sim = self.ocr.string_similarity(f"['{dst_name.upper()}']", str(ocr_textlist))
 
@@ -1313,8 +1313,10 @@ class EDAutopilot:
         maxLoc = 0
         maxVal = 0
         # for i in range(2):
-        dst_image, (minVal, maxVal, minLoc, maxLoc), match = scr_reg.match_template_in_region('target', 'target')
-        dst_image_occ, (minVal, maxVal_occ, minLoc, maxLoc_occ), match_occ = scr_reg.match_template_in_region('target_occluded', 'target_occluded', inv_col=False)
+        # Grab both regions with a single screen capture
+        target_img, target_occ_img = scr_reg.capture_regions(self.scr, ['target', 'target_occluded'])
+        dst_image, (minVal, maxVal, minLoc, maxLoc), match = scr_reg.match_template_in_region('target', 'target', image=target_img)
+        dst_image_occ, (minVal, maxVal_occ, minLoc, maxLoc_occ), match_occ = scr_reg.match_template_in_region('target_occluded', 'target_occluded', inv_col=False, image=target_occ_img)
         #
         #     # need > x in the match to say we do have a destination
         #     if maxVal < (scr_reg.target_thresh / 2):
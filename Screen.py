@@ -1,16 +1,15 @@
 from __future__ import annotations
 import typing
-from copy import copy
+from copy import copy, deepcopy
 
-import cv2
 import win32con
 import win32gui
-from numpy import array
-import mss
 import json
 
 from EDlogger import logger
-from Screen_Regions import Quad
+
+if typing.TYPE_CHECKING:
+    from Screen_Regions import Quad
 
 """
 File:Screen.py    
@@ -32,38 +31,83 @@ from ctypes import wintypes
 
 elite_dangerous_window = "Elite - Dangerous (CLIENT)"
 
+# cv2, mss and numpy take a long time to import and are not needed by the ED window functions below (i.e.
+# set_focus_elite_window), so they are only imported when the first Screen is created. The names are private so that
+# 'from Screen import *' does not export them as None over the caller's own imports.
+_cv2 = None
+_mss = None
+_np = None
+
+
+def _import_capture_modules():
+    """ Imports the screen capture and image modules into the module globals, if not already imported. """
+    global _cv2, _mss, _np
+    if _cv2 is None:
+        import cv2 as _cv2
+        import mss as _mss
+        import numpy as _np
+
+
+_opencl_checked = False  # OpenCL is only initialised on the first UMat capture
+
+
+def _enable_opencl():
+    """ Lets OpenCV run UMat images on the GPU (OpenCL T-API), if available. Only done when a UMat is first
+    requested, as initialising the OpenCL runtime is slow and affects all OpenCV calls in the process. """
+    global _opencl_checked
+    if not _opencl_checked:
+        _opencl_checked = True
+        if _cv2.ocl.haveOpenCL():
+            _cv2.ocl.setUseOpenCL(True)
+            logger.debug('OpenCL is available, OpenCV will use it for UMat images.')
+
+
+_ED_HWND: int | None = None  # Cached handle of the ED window, re-resolved when it is no longer valid
+
+
+def get_elite_window_handle() -> int | None:
+    """ Gets the handle of the ED window. The handle is cached and only looked up again (with FindWindow)
+    when the cached handle is no longer a valid window, i.e. ED was restarted.
+    Returns the window handle or None.
+    """
+    global _ED_HWND
+    if _ED_HWND is not None and win32gui.IsWindow(_ED_HWND):
+        return _ED_HWND
+
+    hwnd = win32gui.FindWindow(None, elite_dangerous_window)
+    _ED_HWND = hwnd if hwnd else None
+    return _ED_HWND
+
 
 def set_focus_elite_window():
     """ set focus to the ED window, if ED does not have focus then the keystrokes will go to the window
     that does have focus. """
-    ed_title = "Elite - Dangerous (CLIENT)"
+    handle = get_elite_window_handle()
+    if handle is None:
+        return
 
-    # TODO - determine if GetWindowText is faster than FindWindow if ED is in foreground
-    if win32gui.GetWindowText(win32gui.GetForegroundWindow()) == ed_title:
+    # Compare the handle instead of getting the foreground window text
+    if win32gui.GetForegroundWindow() == handle:
         return
 
-    handle = win32gui.FindWindow(0, ed_title)
-    if handle != 0:
-        try:
-            win32gui.ShowWindow(handle, win32con.SW_NORMAL)  # give focus to ED
-            win32gui.SetForegroundWindow(handle)  # give focus to ED
-        except:
-            print("set_focus_elite_window ERROR")
-            pass
+    try:
+        win32gui.ShowWindow(handle, win32con.SW_NORMAL)  # give focus to ED
+        win32gui.SetForegroundWindow(handle)  # give focus to ED
+    except:
+        print("set_focus_elite_window ERROR")
+        pass
 
 
 def crop_image_by_pct(image, quad: Quad):
     """ Crop an image using a percentage values (0.0 - 1.0).
     Rect is an array of crop % [0.10, 0.20, 0.90, 0.95] = [Left, Top, Right, Bottom]
     Returns the cropped image. """
-    # Existing size
-    h, w, ch = image.shape
-    # Make a local copy
-    q = copy(quad)
-    # Scale from percent to pixels
-    q.scale_from_origin(w, h)
-    # Crop image
-    cropped = crop_image_pix(image, q)
+    # Existing size (works for both color and grayscale images)
+    h, w = image.shape[:2]
+    # Scale the bounds from percent to pixels and crop the image. Scaling the bounds directly is equivalent
+    # to scaling a copy of the quad, without creating a new quad and points on every call.
+    cropped = image[int(quad.get_top() * h):int(quad.get_bottom() * h),
+                    int(quad.get_left() * w):int(quad.get_right() * w)]  # i.e. [y:y+h, x:x+w]
     return cropped
 
 
@@ -76,10 +120,38 @@ def crop_image_pix(image, quad: Quad):
     return cropped
 
 
+def _make_rect_abs(W: int, H: int):
+    """ Makes a screen_rect_to_abs function for the given screen size. The size is bound in the closure, so
+    each call does not need to look up the screen width and height attributes.
+    @param W: The screen width in pixels.
+    @param H: The screen height in pixels.
+    @return: The conversion function.
+    """
+    cache = {}  # Pixel rects by percent rect
+
+    def screen_rect_to_abs(rect):
+        """ Converts and array of real percentage screen values to int absolutes.
+        The results are cached, as the same regions are converted repeatedly.
+        @param rect: A rect array ([L, T, R, B]) in percent (0.0 - 1.0)
+        @return: A rect tuple (L, T, R, B) in pixels
+        """
+        key = (rect[0], rect[1], rect[2], rect[3])
+        abs_rect = cache.get(key)
+        if abs_rect is None:
+            abs_rect = (int(rect[0] * W), int(rect[1] * H), int(rect[2] * W), int(rect[3] * H))
+            cache[key] = abs_rect
+        return abs_rect
+
+    return screen_rect_to_abs
+
+
 class Screen:
+    _config_cache: dict[str, dict] = {}  # Parsed config files by file name, shared by all instances
+
     def __init__(self, cb):
+        _import_capture_modules()
         self.ap_ckb = cb
-        self.mss = mss.mss()
+        self.mss = _mss.mss()
         self.using_screen = True  # True to use screen, false to use an image. Set screen_image to the image
         self._screen_image = None  # Screen image captured from screen, or loaded by user for testing.
         self.screen_width = 0
@@ -89,6 +161,7 @@ class Screen:
         self.monitor_number = 0
         self.aspect_ratio = 0
         self.mon = None
+        self._buf_cache: dict[tuple[int, int], _np.ndarray] = {}  # Reusable BGR capture buffers by (height, width)
 
         # Find ED window position to determine which monitor it is on
         ed_rect = self.get_elite_window_rect()
@@ -101,37 +174,29 @@ class Screen:
 
         # Examine all monitors to determine match with ED
         self.mons = self.mss.monitors
-        mon_num = 0
-        default = True
-        for item in self.mons:
+        for mon_num, item in enumerate(self.mons):
             logger.debug(f'Found monitor {mon_num} with details: {item}')
-            if mon_num > 0:  # ignore monitor 0 as it is the complete desktop (dims of all monitors)
-                if ed_rect is not None:
-                    if item['left'] == ed_rect[0] and item['top'] == ed_rect[1]:
-                        # Get information of monitor
-                        self.monitor_number = mon_num
-                        self.mon = self.mss.monitors[self.monitor_number]
-                        self.screen_width = item['width']
-                        self.screen_height = item['height']
-                        self.aspect_ratio = self.screen_width / self.screen_height
-                        self.screen_left = item['left']
-                        self.screen_top = item['top']
-                        logger.debug(f'Elite Dangerous is on monitor {mon_num}.')
-                        default = False
-                        break
-
-            # Store the first monitor incase we need it as default
-            if mon_num == 1:
-                self.monitor_number = mon_num
-                self.mon = self.mss.monitors[self.monitor_number]
-                self.screen_width = item['width']
-                self.screen_height = item['height']
-                self.aspect_ratio = self.screen_width / self.screen_height
-                self.screen_left = item['left']
-                self.screen_top = item['top']
-
-            # Next monitor
-            mon_num = mon_num + 1
+
+        # Top left origin of each monitor as (L, T, monitor number). Ignore monitor 0 as it is the complete
+        # desktop (dims of all monitors).
+        mon_origins = [(m['left'], m['top'], i) for i, m in enumerate(self.mons) if i > 0]
+
+        # Find the monitor whose origin matches the top left of the ED window. Captures use the monitor origin,
+        # so ED in a window away from the top left would not be captured correctly and is reported as not found.
+        ed_mon = None
+        if ed_rect is not None:
+            ed_mon = next((i for left, top, i in mon_origins if left == ed_rect[0] and top == ed_rect[1]), None)
+
+        # Use the first monitor as the default if ED was not found on a monitor
+        default = ed_mon is None
+        self.monitor_number = 1 if default else ed_mon
+        self.mon = self.mons[self.monitor_number]
+        self.screen_width = self.mon['width']
+        self.screen_height = self.mon['height']
+        self.screen_rect_to_abs = _make_rect_abs(self.screen_width, self.screen_height)
+        self.aspect_ratio = self.screen_width / self.screen_height
+        self.screen_left = self.mon['left']
+        self.screen_top = self.mon['top']
 
         # Check if ED was found on a monitor, or if we are using the default monitor
         if default:
@@ -139,6 +204,8 @@ class Screen:
                    f"is visible on screen.")
             self.ap_ckb('log', f"ERROR: {msg}")
             logger.error(msg)
+        else:
+            logger.debug(f'Elite Dangerous is on monitor {self.monitor_number}.')
 
         # Add new screen resolutions here with tested scale factors
         # this table will be default, overwritten when loading resolution.json file
@@ -193,7 +260,7 @@ class Screen:
         """ Gets the ED window rectangle.
         Returns (left, top, right, bottom) or None.
         """
-        hwnd = win32gui.FindWindow(None, elite_dangerous_window)
+        hwnd = get_elite_window_handle()
         if hwnd:
             # Get Client Rect (width/height)
             rect = win32gui.GetClientRect(hwnd)
@@ -214,7 +281,7 @@ class Screen:
     def elite_window_exists() -> bool:
         """ Does the ED Client Window exist (i.e. is ED running)
         """
-        hwnd = win32gui.FindWindow(None, elite_dangerous_window)
+        hwnd = get_elite_window_handle()
         if hwnd:
             return True
         else:
@@ -226,14 +293,21 @@ class Screen:
         try:
             with open(fileName,"w") as fp:
                 json.dump(data,fp, indent=4)
+            Screen._config_cache[fileName] = deepcopy(data)
         except Exception as e:
             logger.warning("Screen.py write_config error:"+str(e))
 
     def read_config(self, fileName='./configs/resolution.json'):
-        s = None
+        """ Reads the config file. The file is only parsed once, later calls (including from other Screen
+        instances) return a copy of the cached result. """
+        s = Screen._config_cache.get(fileName)
+        if s is not None:
+            return deepcopy(s)
+
         try:
             with open(fileName,"r") as fp:
                 s = json.load(fp)
+            Screen._config_cache[fileName] = deepcopy(s)
         except  Exception as e:
             logger.warning("Screen.py read_config error :"+str(e))
 
@@ -244,8 +318,14 @@ class Screen:
         image = self.get_screen(int(reg[0]), int(reg[1]), int(reg[2]), int(reg[3]), rgb)
         return image
 
-    def get_screen(self, x_left, y_top, x_right, y_bot, rgb=True):    # if absolute need to scale??
-        """ Get screen from co-ords in pixels."""
+    def get_screen(self, x_left, y_top, x_right, y_bot, rgb=True, reuse_buffer=False, as_umat=False):    # if absolute need to scale??
+        """ Get screen from co-ords in pixels.
+        @param reuse_buffer: If True, the image is written to a buffer that is kept and reused for the next capture
+        of the same size, avoiding an allocation per capture. The caller must copy the image if it needs to keep
+        it after the next capture.
+        @param as_umat: If True, the image is returned as a cv2.UMat, so following OpenCV calls (resize, cvtColor,
+        threshold...) can run on the GPU via OpenCL. Use .get() on the result to get a numpy image back.
+        """
         monitor = {
             "top": self.mon["top"] + int(y_top),
             "left": self.mon["left"] + int(x_left),
@@ -253,12 +333,46 @@ class Screen:
             "height": int(y_bot - y_top),
             "mon": self.monitor_number,
         }
-        image = array(self.mss.grab(monitor))
-        # mss.grab() returns BGRA on Windows. Convert to BGR for OpenCV consistency.
+        sct_img = self.mss.grab(monitor)
+        # Wrap the raw BGRA buffer without copying it.
+        bgra = _np.frombuffer(sct_img.raw, dtype=_np.uint8).reshape(sct_img.height, sct_img.width, 4)
+        # mss.grab() returns BGRA on Windows. Convert to BGR for OpenCV consistency (the only copy made).
         # The 'rgb' parameter is kept for API compatibility but always returns BGR now.
-        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        if reuse_buffer:
+            key = (sct_img.height, sct_img.width)
+            buf = self._buf_cache.get(key)
+            if buf is None:
+                buf = _np.empty((sct_img.height, sct_img.width, 3), _np.uint8)
+                self._buf_cache[key] = buf
+            image = _cv2.cvtColor(bgra, _cv2.COLOR_BGRA2BGR, dst=buf)
+        else:
+            image = _cv2.cvtColor(bgra, _cv2.COLOR_BGRA2BGR)
+        if as_umat:
+            # Single upload of the BGR image
+            _enable_opencl()
+            return _cv2.UMat(image)
         return image
         
+    def get_screen_multi(self, rects) -> list:
+        """ Grabs the screen once, covering all the given regions, and returns an image of each region.
+        The region images are views into the single capture, so the screen is only grabbed and converted once.
+        @param rects: A list of rect arrays ([L, T, R, B]) in pixels.
+        @return: A list of images, one for each rect.
+        """
+        left = min(int(r[0]) for r in rects)
+        top = min(int(r[1]) for r in rects)
+        right = max(int(r[2]) for r in rects)
+        bottom = max(int(r[3]) for r in rects)
+
+        if self.using_screen:
+            image = self.get_screen(left, top, right, bottom)
+        else:
+            if self._screen_image is None:
+                return [None] * len(rects)
+            image = self._screen_image[top:bottom, left:right]
+
+        return [image[int(r[1]) - top:int(r[3]) - top, int(r[0]) - left:int(r[2]) - left] for r in rects]
+
     def get_screen_rect_pct(self, rect):
         """ Grabs a screenshot and returns the selected region as an image.
         @param rect: A rect array ([L, T, R, B]) in percent (0.0 - 1.0)
@@ -272,19 +386,11 @@ class Screen:
             if self._screen_image is None:
                 return None
 
+            from Screen_Regions import Quad
             q = Quad.from_rect(rect)
             image = crop_image_by_pct(self._screen_image, q)
             return image
 
-    def screen_rect_to_abs(self, rect):
-        """ Converts and array of real percentage screen values to int absolutes.
-        @param rect: A rect array ([L, T, R, B]) in percent (0.0 - 1.0)
-        @return: A rect array ([L, T, R, B]) in pixels
-        """
-        abs_rect = [int(rect[0] * self.screen_width), int(rect[1] * self.screen_height),
-                    int(rect[2] * self.screen_width), int(rect[3] * self.screen_height)]
-        return abs_rect
-
     def screen_region_pct_to_pix(self, quad: Quad) -> Quad:
         """ Converts and array of real percentage screen values to int absolutes.
         @param quad: A rect array ([L, T, R, B]) in percent (0.0 - 1.0)
@@ -320,5 +426,6 @@ class Screen:
         # Set the screen size to the original image size, not the region size
         self.screen_width = w
         self.screen_height = h
+        self.screen_rect_to_abs = _make_rect_abs(w, h)
         self.screen_left = 0
         self.screen_top = 0
@@ -1,7 +1,7 @@
 from copy import copy
 
 import numpy as np
-from numpy import array, sum
+from numpy import array
 import cv2
 from datetime import datetime
 
@@ -74,21 +74,35 @@ class Screen_Regions:
         Returns an unfiltered image. """
         return screen.get_screen_region(self.reg[region_name]['rect'])
 
+    def capture_regions(self, screen, region_names) -> list:
+        """ Grab the screen once for all the named regions.
+        Returns an unfiltered image for each region. """
+        return screen.get_screen_multi([self.reg[region_name]['rect'] for region_name in region_names])
+
     def capture_region_filtered(self, screen, region_name, inv_col=True):
         """ Grab screen region and call its filter routine.
         Returns the filtered image. """
         scr = screen.get_screen_region(self.reg[region_name]['rect'], inv_col)
+        return self.filter_region_image(region_name, scr)
+
+    def filter_region_image(self, region_name, image):
+        """ Call the region filter routine on an image already captured for the region.
+        Returns the filtered image. """
         if self.reg[region_name]['filterCB'] is None:
             # return the screen region untouched in BGRA format.
-            return scr
+            return image
         else:
             # return the screen region in the format returned by the filter.
-            return self.reg[region_name]['filterCB'](scr, self.reg[region_name]['filter'])
+            return self.reg[region_name]['filterCB'](image, self.reg[region_name]['filter'])
 
-    def match_template_in_region(self, region_name, templ_name, inv_col=True):
+    def match_template_in_region(self, region_name, templ_name, inv_col=True, image=None):
         """ Attempt to match the given template in the given region which is filtered using the region filter.
+        If an image of the region is provided (i.e. from capture_regions), it is used instead of grabbing the screen.
         Returns the filtered image, detail of match and the match mask. """
-        img_region = self.capture_region_filtered(self.screen, region_name, inv_col)    # which would call, reg.capture_region('compass') and apply defined filter
+        if image is None:
+            img_region = self.capture_region_filtered(self.screen, region_name, inv_col)    # which would call, reg.capture_region('compass') and apply defined filter
+        else:
+            img_region = self.filter_region_image(region_name, image)
         templ_img = self.templates.template[templ_name]['image']
         
         # Get dimensions (handle both 2D grayscale and 3D color images)
@@ -107,11 +121,15 @@ class Screen_Regions:
         (minVal, maxVal, minLoc, maxLoc) = cv2.minMaxLoc(match)
         return img_region, (minVal, maxVal, minLoc, maxLoc), match
 
-    def match_template_in_region_x3(self, region_name, templ_name, inv_col=True):
+    def match_template_in_region_x3(self, region_name, templ_name, inv_col=True, image=None):
         """ Attempt to match the given template in the given region which is unfiltered.
         The region's image is split into separate HSV channels, each channel tested and the best result kept.
+        If an image of the region is provided, it is used instead of grabbing the screen.
         Returns the image, detail of match and the match mask. """
-        img_region = self.screen.get_screen_region(self.reg[region_name]['rect'], rgb=False)
+        if image is None:
+            img_region = self.screen.get_screen_region(self.reg[region_name]['rect'], rgb=False)
+        else:
+            img_region = image
         templ = self.templates.template[templ_name]['image']
 
         # Safety guard: check if region is large enough for template matching
@@ -189,7 +207,8 @@ class Screen_Regions:
         return image, (minVal_h, maxVal_h, minLoc_h, maxLoc_h), match_h
 
     def detect_dashed_circle(self, region_name, expected_radius_px=None, radius_tolerance=0.2, 
-                             ring_score_thresh=0.5, min_gap_gain=0.15, max_run_length=20, debug_image=None):
+                             ring_score_thresh=0.5, min_gap_gain=0.15, max_run_length=20, debug_image=None,
+                             image=None, hough_param2=15):
         """
         Detects if a dashed circle exists in the region (used for occlusion detection).
         
@@ -200,10 +219,15 @@ class Screen_Regions:
         @param min_gap_gain: Minimum (ring_support - coverage_raw) to consider it dashed.
         @param max_run_length: Reject if the longest contiguous 'on' segment exceeds this (indicates solid arc).
         @param debug_image: Optional BGR image for drawing debug info (modified in-place).
+        @param image: Optional BGR image of the region, used instead of grabbing the screen.
+        @param hough_param2: Hough accumulator threshold for circle centers. Lower finds more (weaker) candidates.
         @return: (found: bool, score: float, circle: (x, y, r) or None, debug_info: dict)
         """
         # Capture the region (BGR)
-        img_bgr = self.screen.get_screen_region(self.reg[region_name]['rect'], rgb=False)
+        if image is None:
+            img_bgr = self.screen.get_screen_region(self.reg[region_name]['rect'], rgb=False)
+        else:
+            img_bgr = image
         
         # Derive expected radius from template if not provided
         if expected_radius_px is None:
@@ -245,7 +269,7 @@ class Screen_Regions:
             dp=1.2,
             minDist=min_dist,
             param1=50,
-            param2=15,
+            param2=hough_param2,
             minRadius=min_radius,
             maxRadius=max_radius
         )
@@ -262,44 +286,36 @@ class Screen_Regions:
         if circles is not None:
             circles = np.round(circles[0, :]).astype(int)
             debug_info['candidates'] = len(circles)
-            
+
+            # Use a tighter window (3x3) to avoid 'smearing' gaps. A 3x3 dilate gives, for every pixel, whether
+            # there is an edge in the window around it, so each sample point is a single lookup.
+            window_kernel = np.ones((3, 3), np.uint8)
+            closed_hit_map = cv2.dilate(edges_closed, window_kernel) > 0
+            raw_hit_map = cv2.dilate(edges, window_kernel) > 0
+
+            # Ring support score: sample points around circumference and check edge hits
+            num_samples = 72  # Every 5 degrees
+            angles = 2 * np.pi * np.arange(num_samples) / num_samples
+            cos_a = np.cos(angles)
+            sin_a = np.sin(angles)
+
             for (cx, cy, r) in circles:
-                # Ring support score: sample points around circumference and check edge hits
-                num_samples = 72  # Every 5 degrees
-                edge_hits = 0
-                
-                # Dashiness metrics
-                raw_hits = 0
-                hit_sequence = []
-                
-                for i in range(num_samples):
-                    angle = 2 * np.pi * i / num_samples
-                    px = int(cx + r * np.cos(angle))
-                    py = int(cy + r * np.sin(angle))
-                    
-                    # Check bounds
-                    if 0 <= px < img_w and 0 <= py < img_h:
-                        # Use a tighter window to avoid 'smearing' gaps
-                        window_size = 1
-                        x_min = max(0, px - window_size)
-                        x_max = min(img_w, px + window_size + 1)
-                        y_min = max(0, py - window_size)
-                        y_max = min(img_h, py + window_size + 1)
-                        
-                        # 1. Ring Support (closed edges) - existing metric
-                        window_closed = edges_closed[y_min:y_max, x_min:x_max]
-                        if np.any(window_closed > 0):
-                            edge_hits += 1
-
-                        # 2. Dashiness (raw edges) - new metric
-                        window_raw = edges[y_min:y_max, x_min:x_max]
-                        is_hit = False
-                        if np.any(window_raw > 0):
-                            raw_hits += 1
-                            is_hit = True
-                        hit_sequence.append(1 if is_hit else 0)
-                    else:
-                        hit_sequence.append(0)
+                px = (cx + r * cos_a).astype(int)
+                py = (cy + r * sin_a).astype(int)
+
+                # Check bounds, points off the image are misses
+                in_bounds = (px >= 0) & (px < img_w) & (py >= 0) & (py < img_h)
+                px = np.clip(px, 0, img_w - 1)
+                py = np.clip(py, 0, img_h - 1)
+
+                # 1. Ring Support (closed edges) - existing metric
+                closed_hits = closed_hit_map[py, px] & in_bounds
+                # 2. Dashiness (raw edges) - new metric
+                raw_hit_arr = raw_hit_map[py, px] & in_bounds
+
+                edge_hits = int(np.count_nonzero(closed_hits))
+                raw_hits = int(np.count_nonzero(raw_hit_arr))
+                hit_sequence = raw_hit_arr.astype(int).tolist()
                 
                 # Compute metrics
                 ring_support = edge_hits / num_samples
@@ -307,22 +323,14 @@ class Screen_Regions:
                 gap_gain = ring_support - coverage_raw
                 
                 # Analyze hit sequence for runs
-                transitions = 0
                 longest_on = 0
-                current_on = 0
                 longest_off = 0
-                current_off = 0
                 
                 # Double the sequence to handle wrap-around correctly for run counting
                 seq_doubled = hit_sequence + hit_sequence
                 
-                # Just counting transitions first
-                if len(hit_sequence) > 0:
-                    for i in range(len(hit_sequence)):
-                        curr_val = hit_sequence[i]
-                        next_val = hit_sequence[(i + 1) % len(hit_sequence)]
-                        if curr_val != next_val:
-                            transitions += 1
+                # Just counting transitions first (including the wrap-around from the last to the first sample)
+                transitions = int(np.count_nonzero(raw_hit_arr != np.roll(raw_hit_arr, -1)))
                 
                 # Scan for max runs in the doubled sequence (truncated to 1.5x length to be safe)
                 # But simpler: just iterate once with state
@@ -462,11 +470,12 @@ class Screen_Regions:
     # percent the image is white
     def sun_percent(self, screen):
         blackAndWhiteImage = self.capture_region_filtered(screen, 'sun')
- 
-        wht = sum(blackAndWhiteImage == 255)     
-        blk = sum(blackAndWhiteImage != 255)
 
-        result = int((wht / (wht+blk))*100)
+        # The threshold output is binary (0 or 255), so count the white pixels directly
+        # instead of building two boolean masks.
+        wht = cv2.countNonZero(blackAndWhiteImage)
+
+        result = int((wht / blackAndWhiteImage.size)*100)
 
         return result
 
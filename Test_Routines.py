@@ -1,6 +1,8 @@
 import cv2
 import os
+import queue
 import sys
+import threading
 import time
 import numpy as np
 
@@ -9,6 +11,25 @@ import Screen_Regions
 import Image_Templates
 import Screen
 
+# Loaded templates by scale, so images of the same size do not reload and rescale all the templates
+_TEMPL_CACHE = {}
+
+
+def get_templates(scale_x, scale_y):
+    """ Returns the templates for the scale, loading them on first use. """
+    key = (round(scale_x, 4), round(scale_y, 4))
+    templ = _TEMPL_CACHE.get(key)
+    if templ is None:
+        templ = Image_Templates.Image_Templates(scale_x, scale_y, scale_x, scale_x)
+        _TEMPL_CACHE[key] = templ
+    return templ
+
+
+def _no_print(*args, **kwargs):
+    """ Replaces print when the diagnostics are not wanted. """
+    pass
+
+
 class DummyCallback:
     """ Mock callback for Screen class logging """
     def __call__(self, event, msg):
@@ -34,10 +55,12 @@ class StaticScreen:
         """ Returns the sub-image for the given rect [x1, y1, x2, y2] """
         x1, y1, x2, y2 = rect
         # Clamp to image bounds
-        x1 = max(0, min(x1, self.screen_width))
-        y1 = max(0, min(y1, self.screen_height))
-        x2 = max(0, min(x2, self.screen_width))
-        y2 = max(0, min(y2, self.screen_height))
+        w = self.screen_width
+        h = self.screen_height
+        x1 = min(max(x1, 0), w)
+        y1 = min(max(y1, 0), h)
+        x2 = min(max(x2, 0), w)
+        y2 = min(max(y2, 0), h)
         
         region = self.frame[y1:y2, x1:x2]
         
@@ -46,7 +69,33 @@ class StaticScreen:
         return region # Return BGR by default (matches Screen.get_screen_region(rgb=False))
 
 
-def test_occlusion_logic(scr_reg, frame, path="Live Capture"):
+# StaticScreen classes specialized for a frame size, by (width, height)
+_STATIC_SCREEN_CLASSES = {}
+
+
+def _make_static_screen(w, h):
+    """ Returns a StaticScreen subclass for frames of the given size, created on first use. The size is bound
+    in the region function closure, so the clamping does not look up the screen size on every call. """
+    cls = _STATIC_SCREEN_CLASSES.get((w, h))
+    if cls is not None:
+        return cls
+
+    def get_screen_region(self, rect, rgb=False):
+        """ Returns the sub-image for the given rect [x1, y1, x2, y2] """
+        x1, y1, x2, y2 = rect
+        # Clamp to image bounds
+        region = self.frame[min(max(y1, 0), h):min(max(y2, 0), h), min(max(x1, 0), w):min(max(x2, 0), w)]
+
+        if rgb:
+            return cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
+        return region
+
+    cls = type(f"StaticScreen{w}x{h}", (StaticScreen,), {'get_screen_region': get_screen_region})
+    _STATIC_SCREEN_CLASSES[(w, h)] = cls
+    return cls
+
+
+def test_occlusion_logic(scr_reg, frame, path="Live Capture", verbose=True):
     """
     Simulate the is_destination_occluded logic from ED_AP.py and print diagnostics.
     
@@ -55,61 +104,113 @@ def test_occlusion_logic(scr_reg, frame, path="Live Capture"):
     2. Occluded target match (target_occluded template)
     3. Dashed circle shape detection (fallback)
     4. Final decision: occluded=True/False
+    Set 'verbose' False to not print the diagnostics (errors are still printed).
     """
-    print(f"\n{'='*60}")
-    print(f"Testing: {os.path.basename(path)}")
-    print(f"Frame size: {frame.shape[1]}x{frame.shape[0]}, Scale: {scr_reg.screen.scaleX:.3f}")
-    print(f"{'='*60}")
-    
+    log = print if verbose else _no_print
+    log(f"\n{'='*60}")
+    log(f"Testing: {os.path.basename(path)}")
+    log(f"Frame size: {frame.shape[1]}x{frame.shape[0]}, Scale: {scr_reg.screen.scaleX:.3f}")
+    log(f"{'='*60}")
+
+    # Bind the thresholds and matchers once
+    target_thresh = scr_reg.target_thresh
+    occ_thresh = scr_reg.target_occluded_thresh
+    match_region = scr_reg.match_template_in_region
+    match_x3 = scr_reg.match_template_in_region_x3
+
     try:
+        # Capture the ROIs once (BGR) and run all the checks on them. The target and target_occluded regions are
+        # normally the same rect, so share the capture.
+        target_rect = scr_reg.reg['target']['rect']
+        occ_rect = scr_reg.reg['target_occluded']['rect']
+        target_img = scr_reg.screen.get_screen_region(target_rect, rgb=False)
+        occ_img = target_img if occ_rect == target_rect else scr_reg.screen.get_screen_region(occ_rect, rgb=False)
+
+        # A blank ROI (i.e. empty space, loading screen) cannot match anything, so skip all the checks
+        _, std = cv2.meanStdDev(cv2.cvtColor(occ_img, cv2.COLOR_BGR2GRAY))
+        if std[0, 0] < 2.0:
+            log(f"\n    [NOT OCCLUDED] - ROI is blank (std dev: {std[0, 0]:.2f})")
+            return False, 0.0, 0.0, 0.0
+
         # ============ SOLID TARGET CHECK (VETO) ============
-        print("\n[1] Solid Target Check (VETO)")
-        _, (_, target_val_p1, _, _), _ = scr_reg.match_template_in_region('target', 'target')
-        _, (_, target_val_x3, _, _), _ = scr_reg.match_template_in_region_x3('target', 'target')
+        # Checks are run cheapest first (pass1 is one match, x3 is three) and stop as soon as the result is known.
+        log("\n[1] Solid Target Check (VETO)")
+        _, (_, target_val_p1, _, _), _ = match_region('target', 'target', image=target_img)
+        log(f"    target match (pass1): {target_val_p1:.4f}")
+        if target_val_p1 >= target_thresh:
+            target_val_x3 = 0.0
+            log("    target match (x3):    (Skipped - pass1 already matched)")
+        else:
+            _, (_, target_val_x3, _, _), _ = match_x3('target', 'target', image=target_img)
+            log(f"    target match (x3):    {target_val_x3:.4f}")
         target_val = max(target_val_p1, target_val_x3)
-        target_thresh = scr_reg.target_thresh
         target_visible = target_val >= target_thresh
-        
-        print(f"    target match (pass1): {target_val_p1:.4f}")
-        print(f"    target match (x3):    {target_val_x3:.4f}")
-        print(f"    target best:          {target_val:.4f} (thresh: {target_thresh:.2f})")
-        print(f"    VETO active:          {'YES - Target VISIBLE' if target_visible else 'NO'}")
+
+        log(f"    target best:          {target_val:.4f} (thresh: {target_thresh:.2f})")
+        log(f"    VETO active:          {'YES - Target VISIBLE' if target_visible else 'NO'}")
         
         # ============ OCCLUDED TARGET CHECK ============
-        print("\n[2] Occluded Target Check (Template)")
-        _, (_, occ_val_p1, _, _), _ = scr_reg.match_template_in_region('target_occluded', 'target_occluded')
-        _, (_, occ_val_x3, _, _), _ = scr_reg.match_template_in_region_x3('target_occluded', 'target_occluded')
-        occ_val = max(occ_val_p1, occ_val_x3)
-        occ_thresh = scr_reg.target_occluded_thresh
-        occ_template_detected = occ_val >= occ_thresh
-        
-        print(f"    target_occluded match (pass1): {occ_val_p1:.4f}")
-        print(f"    target_occluded match (x3):    {occ_val_x3:.4f}")
-        print(f"    target_occluded best:          {occ_val:.4f} (thresh: {occ_thresh:.2f})")
-        print(f"    Template detects occluded:     {'YES' if occ_template_detected else 'NO'}")
+        log("\n[2] Occluded Target Check (Template)")
+        occ_val = 0.0
+        occ_template_detected = False
+        if not target_visible:
+            _, (_, occ_val_p1, _, _), _ = match_region('target_occluded', 'target_occluded', image=occ_img)
+            log(f"    target_occluded match (pass1): {occ_val_p1:.4f}")
+            if occ_val_p1 >= occ_thresh:
+                occ_val_x3 = 0.0
+                log("    target_occluded match (x3):    (Skipped - pass1 already matched)")
+            else:
+                _, (_, occ_val_x3, _, _), _ = match_x3('target_occluded', 'target_occluded', image=occ_img)
+                log(f"    target_occluded match (x3):    {occ_val_x3:.4f}")
+            occ_val = max(occ_val_p1, occ_val_x3)
+            occ_template_detected = occ_val >= occ_thresh
+
+            log(f"    target_occluded best:          {occ_val:.4f} (thresh: {occ_thresh:.2f})")
+            log(f"    Template detects occluded:     {'YES' if occ_template_detected else 'NO'}")
+        else:
+            log("    (Skipped - VETO active)")
         
         # ============ DASHED CIRCLE FALLBACK ============
-        print("\n[3] Dashed Circle Fallback (Shape Detection)")
+        log("\n[3] Dashed Circle Fallback (Shape Detection)")
         circle_found = False
         circle_score = 0.0
         circle_info = {}
-        if not occ_template_detected:
+        if target_visible:
+            log("    (Skipped - VETO active)")
+        elif not occ_template_detected:
             circle_found, circle_score, circle_result, circle_info = scr_reg.detect_dashed_circle(
                 'target_occluded',
                 ring_score_thresh=0.40,
-                min_gap_gain=0.1
+                min_gap_gain=0.1,
+                image=occ_img
             )
-            print(f"    circle_found:   {circle_found}")
-            print(f"    circle_score:   {circle_score:.3f}")
-            print(f"    candidates:     {circle_info.get('candidates', 0)}")
-            print(f"    coverage:       {circle_info.get('coverage', 0):.2f}")
-            print(f"    runs:           {circle_info.get('runs', 0)}")
-            print(f"    gap_gain:       {circle_info.get('gap_gain', 0):.3f}")
+            if circle_info.get('candidates', 0) == 0:
+                # No candidates at the default Hough accumulator threshold (15). Bisect for the highest lower
+                # threshold that gives candidates, which takes ~3 passes instead of trying each value.
+                # Search [6, 15): lo is a sentinel below the range and is never tried, hi is known to give
+                # no candidates
+                lo, hi = 5, 15
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    result = scr_reg.detect_dashed_circle('target_occluded', ring_score_thresh=0.40,
+                                                          min_gap_gain=0.1, image=occ_img, hough_param2=mid)
+                    if result[3].get('candidates', 0) > 0:
+                        lo = mid
+                        circle_found, circle_score, circle_result, circle_info = result
+                    else:
+                        hi = mid
+                log(f"    hough param2:   {lo if circle_info.get('candidates', 0) > 0 else 'no candidates'}")
+            log(f"    circle_found:   {circle_found}")
+            log(f"    circle_score:   {circle_score:.3f}")
+            log(f"    candidates:     {circle_info.get('candidates', 0)}")
+            log(f"    coverage:       {circle_info.get('coverage', 0):.2f}")
+            log(f"    runs:           {circle_info.get('runs', 0)}")
+            log(f"    gap_gain:       {circle_info.get('gap_gain', 0):.3f}")
         else:
-            print("    (Skipped - template already detected occlusion)")
+            log("    (Skipped - template already detected occlusion)")
         
         # ============ FINAL DECISION ============
-        print("\n[4] Final Decision")
+        log("\n[4] Final Decision")
         if target_visible:
             final_occluded = False
             reason = "VETO: Solid target visible"
@@ -124,7 +225,7 @@ def test_occlusion_logic(scr_reg, frame, path="Live Capture"):
             reason = "No occlusion detected"
         
         status = "[OCCLUDED]" if final_occluded else "[NOT OCCLUDED]"
-        print(f"    {status} - {reason}")
+        log(f"    {status} - {reason}")
         
         return final_occluded, target_val, occ_val, circle_score
         
@@ -171,17 +272,22 @@ class MockAP:
             
         self.debug_overlay = False
         self.cv_view = False
+        self._ocr_buf = None  # Masked RGB image for OCR, reused every frame
 
     def sc_disengage_active(self, scr_reg) -> bool:
         """ Copied logic from ED_AP.py sc_disengage_active for testing """
         # logic from ED_AP.py
         rect = scr_reg.reg['disengage']['rect']
         image = self.scr.get_screen_region(rect)
-        # Fix color space issue mentioned in source
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        mask = scr_reg.capture_region_filtered(self.scr, 'disengage')
-        masked_image = cv2.bitwise_and(image, image, mask=mask)
+        mask = scr_reg.filter_region_image('disengage', image)
+
+        # Fix color space issue mentioned in source and mask in a single pass, into a buffer reused every frame
+        masked_image = self._ocr_buf
+        if masked_image is None or masked_image.shape != image.shape:
+            masked_image = np.empty_like(image)
+            self._ocr_buf = masked_image
+        masked_image.fill(0)
+        np.copyto(masked_image, image[:, :, ::-1], where=mask[:, :, None] != 0)
         
         # We process 'masked_image' for OCR
         # OCR the selected item
@@ -198,16 +304,19 @@ class MockAP:
         return sim > sim_match, sim, ocr_textlist
 
 
-def test_disengage_logic(scr_reg, frame, path="Live Capture"):
+def test_disengage_logic(scr_reg, frame, path="Live Capture", mock_ap=None, verbose=True):
     """
     Test the 'Press [J] to Disengage' detection.
     Checks:
     1. Template Match (sc_disengage_label_up)
     2. OCR Match (sc_disengage_active) - The "Primary" check in modern ED_AP
+    Pass in 'mock_ap' to reuse it (and its OCR) between calls, otherwise one is created.
+    Set 'verbose' False to not print the diagnostics (errors are still printed).
     """
-    print(f"\n{'='*60}")
-    print(f"Testing Disengage: {os.path.basename(path)}")
-    print(f"{'='*60}")
+    log = print if verbose else _no_print
+    log(f"\n{'='*60}")
+    log(f"Testing Disengage: {os.path.basename(path)}")
+    log(f"{'='*60}")
 
     try:
         # 1. Template Match (Legacy/Trigger)
@@ -231,7 +340,7 @@ def test_disengage_logic(scr_reg, frame, path="Live Capture"):
         thresh = scr_reg.disengage_thresh
         detected_template = disengage_val >= thresh
         
-        print(f"    [Template] Match Score: {disengage_val:.4f} (thresh: {thresh:.2f}) -> {'YES' if detected_template else 'NO'}")
+        log(f"    [Template] Match Score: {disengage_val:.4f} (thresh: {thresh:.2f}) -> {'YES' if detected_template else 'NO'}")
 
         # 2. OCR Match (Active Check)
         # We need an instance of a MockAP to run the logic or copy it here.
@@ -247,12 +356,13 @@ def test_disengage_logic(scr_reg, frame, path="Live Capture"):
         text = ""
         
         if frame.shape[1] >= 1000:
-            mock_ap = MockAP(scr_reg.screen)
+            if mock_ap is None:
+                mock_ap = MockAP(scr_reg.screen)
             detected_ocr, sim, text = mock_ap.sc_disengage_active(scr_reg)
-            print(f"    [OCR]      Similarity:  {sim:.4f} (thresh: 0.35) -> {'YES' if detected_ocr else 'NO'}")
-            print(f"    [OCR]      Found Text:  {text}")
+            log(f"    [OCR]      Similarity:  {sim:.4f} (thresh: 0.35) -> {'YES' if detected_ocr else 'NO'}")
+            log(f"    [OCR]      Found Text:  {text}")
         else:
-            print("    [OCR]      Skipped (Image too small/cropped for full coordinate lookup)")
+            log("    [OCR]      Skipped (Image too small/cropped for full coordinate lookup)")
 
         return (detected_template or detected_ocr), disengage_val
         
@@ -263,8 +373,78 @@ def test_disengage_logic(scr_reg, frame, path="Live Capture"):
         return None, 0.0
 
 
-def run_live_test(test_mode='occlusion'):
-    """ Run the specified test in a live loop using screen capture. """
+class FrameGrabber:
+    """ Captures full screen frames in a background thread into two alternating slots, so the capture of the
+    next frame overlaps the processing of the current one. """
+    def __init__(self, screen):
+        self.screen = screen
+        self._slots = [None, None]
+        self._latest = -1  # Slot of the newest frame, or -1 if none yet
+        self._cond = threading.Condition()
+        self._taken = True  # Newest frame has been read, so capture the next
+        self._stop = False
+        self._failed = False  # Capture thread died from an exception
+        self._thread = threading.Thread(target=self._run, name='FrameGrabber', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
+
+    def is_alive(self) -> bool:
+        """ Returns False once the capture thread has stopped or died. """
+        return self._thread.is_alive() and not self._failed
+
+    def _run(self):
+        try:
+            self._capture_loop()
+        except Exception as e:
+            print(f"[FrameGrabber] Capture thread stopped: {e}")
+            with self._cond:
+                self._failed = True
+                self._cond.notify_all()
+
+    def _capture_loop(self):
+        idx = 0
+        while True:
+            # Wait until the newest frame is taken, only stay one frame ahead
+            with self._cond:
+                self._cond.wait_for(lambda: self._taken or self._stop)
+                if self._stop:
+                    return
+
+            frame = self.screen.get_screen_full()
+            if frame is None:
+                time.sleep(0.1)
+                continue
+
+            with self._cond:
+                self._slots[idx] = frame
+                self._latest = idx
+                self._taken = False
+                self._cond.notify_all()
+            idx ^= 1
+
+    def read(self, timeout=1.0):
+        """ Returns the newest frame, waiting for up to 'timeout' secs for a new one, or None. Returns None
+        once the capture thread has died, rather than the last (stale) frame. """
+        with self._cond:
+            self._cond.wait_for(lambda: not self._taken or self._failed, timeout)
+            if self._latest < 0 or self._failed:
+                return None
+            self._taken = True
+            self._cond.notify_all()
+            return self._slots[self._latest]
+
+
+def run_live_test(test_mode='occlusion', verbose=False):
+    """ Run the specified test in a live loop using screen capture.
+    The diagnostics are only printed if 'verbose', as printing every frame slows the loop. The scores are
+    shown on the display instead. """
     print("Initializing Live Screen Capture...")
     print("Press 'q' to quit.")
     
@@ -275,29 +455,56 @@ def run_live_test(test_mode='occlusion'):
         print(f"Failed to initialize Screen: {e}")
         return
 
-    templ = Image_Templates.Image_Templates(screen.scaleX, screen.scaleY, screen.scaleX)
+    templ = Image_Templates.Image_Templates(screen.scaleX, screen.scaleY, screen.scaleX, screen.scaleX)
     scr_reg = Screen_Regions.Screen_Regions(screen, templ)
-    
+
+    # Create the OCR once, not every frame
+    mock_ap = MockAP(screen) if test_mode in ['disengage', 'all'] else None
+
+    # Display buffers, allocated on the first frame and reused for every frame after
+    disp_buf = None
+    small_buf = None
+
+    # The ROIs do not change between frames
+    occ_roi_rect = scr_reg.reg['target_occluded']['rect']  # [x1, y1, x2, y2]
+    dis_roi_rect = scr_reg.reg['disengage']['rect']
+
+    # Capture in the background while the tests run
+    grabber = FrameGrabber(screen)
+    grabber.start()
+
     while True:
         start_time = time.time()
         
         # 1. Capture full screen (for visualization context)
-        frame = screen.get_screen_full()
+        frame = grabber.read()
         if frame is None:
+            if not grabber.is_alive():
+                print("Screen capture stopped.")
+                break
             print("Failed to capture screen.")
             time.sleep(1)
             continue
             
-        disp_frame = frame.copy() # Copy for drawing
+        # Copy for drawing
+        if disp_buf is None or disp_buf.shape != frame.shape:
+            disp_buf = np.empty_like(frame)
+            # Display size, reduced to 1920 wide if 4k
+            small_buf = None
+            if frame.shape[1] > 1920:
+                target_size = (1920, round(frame.shape[0] * 1920 / frame.shape[1]))
+                small_buf = np.empty((target_size[1], target_size[0], 3), np.uint8)
+        np.copyto(disp_buf, frame)
+        disp_frame = disp_buf
             
         # 2. Run Logic & Visualization
         
         # --- OCCLUSION TEST ---
         if test_mode in ['occlusion', 'all']:
-            final_occluded, target_val, occ_val, circle_score = test_occlusion_logic(scr_reg, frame, "Live Stream")
+            final_occluded, target_val, occ_val, circle_score = test_occlusion_logic(scr_reg, frame, "Live Stream", verbose)
             
             # Draw ROI and Status
-            roi_rect = scr_reg.reg['target_occluded']['rect'] # [x1, y1, x2, y2]
+            roi_rect = occ_roi_rect
             color = (0, 0, 255) if final_occluded else (0, 255, 0)
             cv2.rectangle(disp_frame, (roi_rect[0], roi_rect[1]), (roi_rect[2], roi_rect[3]), color, 2)
             
@@ -308,10 +515,10 @@ def run_live_test(test_mode='occlusion'):
 
         # --- DISENGAGE TEST ---
         if test_mode in ['disengage', 'all']:
-            detected, val = test_disengage_logic(scr_reg, frame, "Live Stream")
+            detected, val = test_disengage_logic(scr_reg, frame, "Live Stream", mock_ap, verbose)
             
             # Draw ROI and Status
-            roi_rect = scr_reg.reg['disengage']['rect']
+            roi_rect = dis_roi_rect
             color = (0, 255, 0) if detected else (0, 0, 255) # Green if found
             cv2.rectangle(disp_frame, (roi_rect[0], roi_rect[1]), (roi_rect[2], roi_rect[3]), color, 2)
             
@@ -325,9 +532,8 @@ def run_live_test(test_mode='occlusion'):
         
         # Resize for display if 4k
         final_display = disp_frame
-        if disp_frame.shape[1] > 1920:
-            scale = 1920 / disp_frame.shape[1]
-            final_display = cv2.resize(disp_frame, None, fx=scale, fy=scale)
+        if small_buf is not None:
+            final_display = cv2.resize(disp_frame, target_size, dst=small_buf)
             
         cv2.imshow("Live Test Debug", final_display)
         
@@ -339,91 +545,188 @@ def run_live_test(test_mode='occlusion'):
         if key == ord('q'):
             break
             
+    grabber.stop()
     cv2.destroyAllWindows()
 
 
+class ImageWriter:
+    """ Writes images in a background thread, so the PNG encoding overlaps the processing of the next image. """
+    def __init__(self, max_queued=4):
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = threading.Thread(target=self._run, name='ImageWriter', daemon=True)
+        self._thread.start()
+
+    def write(self, file_name, image):
+        """ Queues the image to be written. The image must not be modified afterwards. If the writer thread has
+        died, the image is written directly instead of blocking on the full queue. """
+        if not self._put((file_name, image)):
+            cv2.imwrite(file_name, image)
+
+    def close(self):
+        """ Waits for all queued images to be written. """
+        if self._put(None):
+            self._thread.join()
+
+    def _put(self, item) -> bool:
+        """ Queues the item, waiting while the queue is full. Returns False if the writer thread is not running. """
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=1.0)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                try:
+                    if not cv2.imwrite(*item):
+                        print(f"[ImageWriter] Failed to write {item[0]}")
+                except Exception as e:
+                    print(f"[ImageWriter] Failed to write {item[0]}: {e}")
+        except Exception as e:
+            print(f"[ImageWriter] Writer thread stopped: {e}")
+
+
+def _read_image(path):
+    """ Loads a test image. Images at least twice the 3440x1440 reference size are decoded at half size,
+    which is still at least the reference size, so template detail is kept at 4x less decode work.
+    Returns the BGR image or None. """
+    from PIL import Image
+    try:
+        # Read the size from the header only, without decoding the image
+        with Image.open(path) as img:
+            w, h = img.size
+    except Exception:
+        w = h = 0
+
+    if w >= 3440 * 2 and h >= 1440 * 2:
+        return cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_2)
+    return cv2.imread(path)
+
+
+def _process_one(path, test_mode, writer=None):
+    """ Run the selected tests on one image file and save the result image, using the ImageWriter if provided.
+    Returns a list of result dicts for the summary. Runs in a worker process when processing in parallel. """
+    results = []
+    if not os.path.exists(path):
+        print(f"File not found: {path}")
+        return results
+
+    frame = _read_image(path)
+    if frame is None:
+         print(f"Could not load image: {path}")
+         return results
+
+    # Initialize environment
+    static_screen = _make_static_screen(frame.shape[1], frame.shape[0])(frame)
+    templ = get_templates(static_screen.scaleX, static_screen.scaleY)
+    scr_reg = Screen_Regions.Screen_Regions(static_screen, templ)
+
+    disp_frame = frame.copy()
+
+    # --- OCCLUSION TEST ---
+    if test_mode in ['occlusion', 'all']:
+        final_occluded, target_val, occ_val, circle_score = test_occlusion_logic(scr_reg, frame, path)
+
+        # Visualize
+        roi_rect = scr_reg.reg['target_occluded']['rect']
+        color = (0, 0, 255) if final_occluded else (0, 255, 0)
+        cv2.rectangle(disp_frame, (roi_rect[0], roi_rect[1]), (roi_rect[2], roi_rect[3]), color, 2)
+        label = "OCCLUDED" if final_occluded else "CLEAR"
+        cv2.putText(disp_frame, label, (roi_rect[0], roi_rect[1] - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+        results.append({
+            'path': path,
+            'test': 'occlusion',
+            'result': final_occluded,
+            'details': f"target={target_val:.2f} occ={occ_val:.2f} circle={circle_score:.2f}"
+        })
+
+    # --- DISENGAGE TEST ---
+    if test_mode in ['disengage', 'all']:
+        detected, val = test_disengage_logic(scr_reg, frame, path)
+
+         # Visualize
+        roi_rect = scr_reg.reg['disengage']['rect']
+        color = (0, 255, 0) if detected else (0, 0, 255)
+        cv2.rectangle(disp_frame, (roi_rect[0], roi_rect[1]), (roi_rect[2], roi_rect[3]), color, 2)
+        label = "DISENGAGE" if detected else "NO MATCH"
+        cv2.putText(disp_frame, label, (roi_rect[0], roi_rect[1] - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+        results.append({
+            'path': path,
+            'test': 'disengage',
+            'result': detected,
+            'details': f"score={val:.2f}"
+        })
+
+    # Save result image
+    out_name = f"test_result_{os.path.basename(path)}"
+    if writer is not None:
+        writer.write(out_name, disp_frame)
+    else:
+        cv2.imwrite(out_name, disp_frame)
+
+    return results
+
+
 def main():
     # Parse arguments
     import argparse
     parser = argparse.ArgumentParser(description="Test EDAP Logic")
     parser.add_argument('images', metavar='IMG', type=str, nargs='*', 
-                        help='Image files to test (offline mode)')
+                        help='Image files, or directories of images, to test (offline mode)')
     parser.add_argument('--live', action='store_true', 
                         help='Force live capture mode (default if no images provided)')
     parser.add_argument('--test', choices=['occlusion', 'disengage', 'all'], default='occlusion',
                         help='Which test suite to run')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print the diagnostics every frame in live capture mode')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of images to process in parallel (offline mode). Output of parallel jobs '
+                             'is interleaved, and each job loads its own OCR for the disengage test.')
     
     args = parser.parse_args()
     
     # Decide mode
     if args.live or not args.images:
-        run_live_test(args.test)
+        run_live_test(args.test, args.verbose)
         return
 
     # Offline Mode
-    image_paths = args.images
+    image_paths = []
+    for arg in args.images:
+        if os.path.isdir(arg):
+            # Add the images in the directory. The scandir entries have the name and type without extra stat calls.
+            with os.scandir(arg) as it:
+                image_paths.extend(sorted(e.path for e in it
+                                          if e.is_file() and e.name.lower().endswith(('.png', '.bmp', '.jpg'))))
+        else:
+            image_paths.append(arg)
     print(f"\nFound {len(image_paths)} test image(s)\n")
 
     results = []
-    
-    for path in image_paths:
-        if not os.path.exists(path):
-            print(f"File not found: {path}")
-            continue
-            
-        frame = cv2.imread(path)
-        if frame is None:
-             print(f"Could not load image: {path}")
-             continue
-        
-        # Initialize environment
-        static_screen = StaticScreen(frame)
-        templ = Image_Templates.Image_Templates(static_screen.scaleX, static_screen.scaleY, static_screen.scaleX)
-        scr_reg = Screen_Regions.Screen_Regions(static_screen, templ)
-        
-        disp_frame = frame.copy()
-        
-        # --- OCCLUSION TEST ---
-        if args.test in ['occlusion', 'all']:
-            final_occluded, target_val, occ_val, circle_score = test_occlusion_logic(scr_reg, frame, path)
-            
-            # Visualize
-            roi_rect = scr_reg.reg['target_occluded']['rect']
-            color = (0, 0, 255) if final_occluded else (0, 255, 0)
-            cv2.rectangle(disp_frame, (roi_rect[0], roi_rect[1]), (roi_rect[2], roi_rect[3]), color, 2)
-            label = "OCCLUDED" if final_occluded else "CLEAR"
-            cv2.putText(disp_frame, label, (roi_rect[0], roi_rect[1] - 10), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            
-            results.append({
-                'path': path,
-                'test': 'occlusion',
-                'result': final_occluded,
-                'details': f"target={target_val:.2f} occ={occ_val:.2f} circle={circle_score:.2f}"
-            })
-
-        # --- DISENGAGE TEST ---
-        if args.test in ['disengage', 'all']:
-            detected, val = test_disengage_logic(scr_reg, frame, path)
-            
-             # Visualize
-            roi_rect = scr_reg.reg['disengage']['rect']
-            color = (0, 255, 0) if detected else (0, 0, 255)
-            cv2.rectangle(disp_frame, (roi_rect[0], roi_rect[1]), (roi_rect[2], roi_rect[3]), color, 2)
-            label = "DISENGAGE" if detected else "NO MATCH"
-            cv2.putText(disp_frame, label, (roi_rect[0], roi_rect[1] - 10), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-            
-            results.append({
-                'path': path,
-                'test': 'disengage',
-                'result': detected,
-                'details': f"score={val:.2f}"
-            })
-
-        # Save result image
-        out_name = f"test_result_{os.path.basename(path)}"
-        cv2.imwrite(out_name, disp_frame)
+    jobs = max(1, min(args.jobs or 1, len(image_paths)))
+    if jobs == 1:
+        writer = ImageWriter()
+        try:
+            for path in image_paths:
+                results.extend(_process_one(path, args.test, writer))
+        finally:
+            writer.close()
+    else:
+        # Each image is independent, so process them in parallel. The output of the images is interleaved.
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for image_results in pool.map(_process_one, image_paths, [args.test] * len(image_paths)):
+                results.extend(image_results)
 
     # Summary
     print(f"\n{'='*60}")
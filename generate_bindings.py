@@ -1,6 +1,8 @@
 import xml.etree.ElementTree as ET
+import copy
 import os
 import shutil
+import sys
 
 # Helper to define key with optional modifier
 def bind(key, modifier=None):
@@ -55,39 +57,39 @@ BINDINGS_OPTIMIZED = {
 }
 
 # Keys that EDAP uses for global hotkeys. We must remove these from ANY game binding to prevent conflicts.
-EDAP_HOTKEYS = ["Key_Home", "Key_End", "Key_Insert", "Key_PageUp"]
+EDAP_HOTKEYS = frozenset({"Key_Home", "Key_End", "Key_Insert", "Key_PageUp"})
 
 SOURCE_FILE = os.path.join("configs", "Bindings", "Custom.4.2.binds")
 OUTPUT_DIR = os.path.join("configs", "Bindings")
 
-def clear_conflicting_keys(root):
+def clear_conflicting_keys(root, msgs):
     """
     Scans all bindings. If a Primary or Secondary binding uses a key in EDAP_HOTKEYS,
-    it clears that binding (sets it to NoDevice).
+    it clears that binding (sets it to NoDevice). Progress messages are appended to msgs.
     """
-    print("Scanning for conflicts with EDAP Hotkeys (Home, End, Insert, PageUp)...")
+    msgs.append("Scanning for conflicts with EDAP Hotkeys (Home, End, Insert, PageUp)...")
     cleared_count = 0
     for command in root:
-        for device_slot in ["Primary", "Secondary"]:
-            slot = command.find(device_slot)
-            if slot is not None:
-                key = slot.get("Key")
-                if key in EDAP_HOTKEYS:
-                    print(f"  Conflict found: {command.tag} [{device_slot}] uses {key}. Clearing...")
-                    slot.set("Device", "{NoDevice}")
-                    slot.set("Key", "")
-                    # Remove modifier if present
-                    mod = slot.find("Modifier")
-                    if mod is not None:
-                        slot.remove(mod)
-                    cleared_count += 1
-    print(f"Cleared {cleared_count} conflicting bindings.")
-
-
-def resolve_conflicts(root, target_key, target_modifier, skip_command):
+        # One pass over the command's children, hotkey test first as it rarely matches
+        for slot in command:
+            key = slot.get("Key")
+            if key in EDAP_HOTKEYS and slot.tag in ("Primary", "Secondary"):
+                msgs.append(f"  Conflict found: {command.tag} [{slot.tag}] uses {key}. Clearing...")
+                slot.set("Device", "{NoDevice}")
+                slot.set("Key", "")
+                # Remove modifier if present
+                mod = slot.find("Modifier")
+                if mod is not None:
+                    slot.remove(mod)
+                cleared_count += 1
+    msgs.append(f"Cleared {cleared_count} conflicting bindings.")
+
+
+def resolve_conflicts(root, target_key, target_modifier, skip_command, msgs):
     """
     Scans all bindings in the XML root. If any command (other than skip_command)
     uses the same key+modifier combination, that binding is cleared to prevent duplicates.
+    Progress messages are appended to msgs.
     """
     cleared_count = 0
     for command in root:
@@ -103,7 +105,7 @@ def resolve_conflicts(root, target_key, target_modifier, skip_command):
                     existing_mod = mod_elem.get("Key") if mod_elem is not None else None
                     
                     if existing_mod == target_modifier:
-                        print(f"  Conflict resolved: {command.tag} [{device_slot}] also uses {target_key} + {target_modifier or 'None'}. Clearing...")
+                        msgs.append(f"  Conflict resolved: {command.tag} [{device_slot}] also uses {target_key} + {target_modifier or 'None'}. Clearing...")
                         slot.set("Device", "{NoDevice}")
                         slot.set("Key", "")
                         if mod_elem is not None:
@@ -112,23 +114,44 @@ def resolve_conflicts(root, target_key, target_modifier, skip_command):
     return cleared_count
 
 
-def generate_binding_file(preset_name, bindings_map, output_filename):
+def load_source_root():
+    """
+    Parses SOURCE_FILE and returns its root element, or None if the file is missing.
+    """
     if not os.path.exists(SOURCE_FILE):
         print(f"Error: Source file {SOURCE_FILE} not found.")
-        return
+        return None
+    return ET.parse(SOURCE_FILE).getroot()
+
 
-    tree = ET.parse(SOURCE_FILE)
-    root = tree.getroot()
+def generate_binding_file(preset_name, bindings_map, output_filename, source_root=None):
+    """
+    Writes a preset built from the source bindings. source_root is the parsed source file
+    (see load_source_root); it is copied, not modified, so one parse can serve several presets.
+    """
+    if source_root is None:
+        source_root = load_source_root()
+        if source_root is None:
+            return
+
+    root = copy.deepcopy(source_root)
+    tree = ET.ElementTree(root)
 
     # Update Root attributes
     root.set("PresetName", preset_name)
     root.set("MajorVersion", "4")
     root.set("MinorVersion", "0")
 
+    # Collect progress messages and write them out in one go at the end
+    msgs = []
+
     # Step 1: Clear EDAP hotkey conflicts
-    clear_conflicting_keys(root)
+    clear_conflicting_keys(root, msgs)
 
-    print(f"Generating {preset_name}...")
+    # Index the command elements by name once, instead of searching the root for each command
+    commands = {element.tag: element for element in root}
+
+    msgs.append(f"Generating {preset_name}...")
     total_conflicts_resolved = 0
 
     for command, binding_def in bindings_map.items():
@@ -140,13 +163,14 @@ def generate_binding_file(preset_name, bindings_map, output_filename):
         modifier = binding_def["Modifier"]
 
         # Step 2: Resolve conflicts for this specific key+modifier before assigning
-        total_conflicts_resolved += resolve_conflicts(root, key, modifier, command)
+        total_conflicts_resolved += resolve_conflicts(root, key, modifier, command, msgs)
 
         # Find the command element
-        element = root.find(command)
+        element = commands.get(command)
         if element is None:
-            print(f"  Warning: Command '{command}' not found in source. Creating it.")
+            msgs.append(f"  Warning: Command '{command}' not found in source. Creating it.")
             element = ET.SubElement(root, command)
+            commands[command] = element
             ET.SubElement(element, "Primary", Device="{NoDevice}", Key="")
             ET.SubElement(element, "Secondary", Device="{NoDevice}", Key="")
         
@@ -155,8 +179,7 @@ def generate_binding_file(preset_name, bindings_map, output_filename):
         if secondary is None:
             secondary = ET.SubElement(element, "Secondary")
         
-        secondary.set("Device", "Keyboard")
-        secondary.set("Key", key)
+        secondary.attrib.update({"Device": "Keyboard", "Key": key})
         
         # Handle Modifier
         # Remove existing modifier if any
@@ -166,22 +189,28 @@ def generate_binding_file(preset_name, bindings_map, output_filename):
             
         if modifier:
             ET.SubElement(secondary, "Modifier", Device="Keyboard", Key=modifier)
-            print(f"  Set {command} Secondary to {modifier} + {key}")
+            msgs.append(f"  Set {command} Secondary to {modifier} + {key}")
         else:
-            print(f"  Set {command} Secondary to {key}")
+            msgs.append(f"  Set {command} Secondary to {key}")
 
-    print(f"\nTotal duplicate bindings resolved: {total_conflicts_resolved}")
+    msgs.append(f"\nTotal duplicate bindings resolved: {total_conflicts_resolved}")
     output_path = os.path.join(OUTPUT_DIR, output_filename)
     tree.write(output_path, encoding="UTF-8", xml_declaration=True)
-    print(f"Saved to {output_path}")
+    msgs.append(f"Saved to {output_path}")
+    sys.stdout.write("\n".join(msgs) + "\n")
 
 
 def main():
     print("Generating EDAPGui Binding Templates...")
     print("=" * 50)
     
+    # Parse the source bindings once, each preset works on its own copy
+    source_root = load_source_root()
+    if source_root is None:
+        return
+
     # Generate Optimized Version
-    generate_binding_file("EDAP_Optimized", BINDINGS_OPTIMIZED, "EDAP_Optimized.4.0.binds")
+    generate_binding_file("EDAP_Optimized", BINDINGS_OPTIMIZED, "EDAP_Optimized.4.0.binds", source_root)
 
     print("\n" + "=" * 50)
     print("Done. Copy the generated .binds files to your Elite Dangerous bindings folder:")
@@ -13,9 +13,9 @@ Key behavior:
 Author: EDAPGui Contributors
 """
 
+import logging
+import threading
 import time
-import math
-from EDlogger import logging
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +44,34 @@ class SupercruiseAvoidance:
             ap: The EDAutopilot instance for accessing ship controls and config.
         """
         self.ap = ap
+        # Set by cancel() to stop a running avoidance sequence at its next wait
+        self._cancel = threading.Event()
+        self.reload_config()
+
+    def cancel(self):
+        """
+        Request the running avoidance sequence to stop. Waits in progress return
+        immediately instead of finishing their sleep.
+        """
+        self._cancel.set()
+
+    def reload_config(self):
+        """
+        Snapshot the SupercruiseAvoidance settings from the autopilot config.
+        
+        Called on init and at the start of each avoidance sequence, so settings
+        changed in the GUI apply from the next sequence onwards.
+        """
+        config = self.ap.config
+        self._require_behind = config.get('SupercruiseAvoidanceRequireBehindPip', True)
+        self._edge_threshold = config.get('SupercruiseAvoidanceCompassEdgeThreshold', 0.9)
+        self._escape_timeout = config.get('SupercruiseAvoidanceEscapeHeadingTimeoutSeconds', 12.0)
+        self._min_pitch = config.get('SupercruiseAvoidanceMinPitchSeconds', 1.5)
+        self._max_attempts = config.get('SupercruiseAvoidanceMaxAttempts', 3)
+        self._base_duration = config.get('SupercruiseAvoidanceDurationBase', 60)
+        self._duration_max = config.get('SupercruiseAvoidanceDurationMax', 120)
+        self._yaw_increment = config.get('SupercruiseAvoidanceYawDegrees', 15)
+        self._hard_escape_seconds = config.get('SupercruiseAvoidanceHardEscapeSeconds', 120)
 
     def _is_path_clear(self, scr_reg) -> bool:
         """
@@ -55,6 +83,28 @@ class SupercruiseAvoidance:
             return False
         return True
 
+    def _interruptible_wait(self, duration, poll=0.5, check_fn=None) -> bool:
+        """
+        Wait for a fixed duration against a monotonic deadline, polling check_fn.
+        
+        Args:
+            duration: Seconds to wait.
+            poll: Maximum seconds to sleep between checks.
+            check_fn: Optional callable, returning True ends the wait early.
+        
+        Returns:
+            bool: True if check_fn or cancel() ended the wait early, False if the full duration elapsed.
+        """
+        deadline = time.monotonic() + duration
+        while True:
+            if check_fn is not None and check_fn():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._cancel.wait(min(poll, remaining)):
+                return True
+
     def _acquire_escape_heading(self, scr_reg) -> tuple:
         """
         Stage A: Acquire escape heading using closed-loop compass steering.
@@ -71,53 +121,59 @@ class SupercruiseAvoidance:
                 - success: True if escape heading was acquired via compass gate
                 - pitch_duration: Seconds spent pitching
         """
-        require_behind = self.ap.config.get('SupercruiseAvoidanceRequireBehindPip', True)
-        edge_threshold = self.ap.config.get('SupercruiseAvoidanceCompassEdgeThreshold', 0.9)
-        timeout = self.ap.config.get('SupercruiseAvoidanceEscapeHeadingTimeoutSeconds', 12.0)
-        min_pitch = self.ap.config.get('SupercruiseAvoidanceMinPitchSeconds', 1.5)
+        require_behind = self._require_behind
+        edge_threshold = self._edge_threshold
+        timeout = self._escape_timeout
+        min_pitch = self._min_pitch
         
         logger.info(f"SupercruiseAvoidance: Acquiring escape heading "
                    f"(edge={edge_threshold}, behind={require_behind}, timeout={timeout}s, min={min_pitch}s)")
         
-        start_time = time.time()
+        # Bind the per-tick callables once, this loop polls at ~10 Hz
+        now = time.monotonic
+        get_nav_offset = self.ap.get_nav_offset
+        cancel_wait = self._cancel.wait
+
+        start_time = now()
+        deadline = start_time + timeout
         self.ap.keys.send('PitchUpButton', state=1)  # Press and hold
         
         gate_satisfied = False
         last_nav_log = 0
         
         try:
-            while (time.time() - start_time) < timeout:
-                nav = self.ap.get_nav_offset(scr_reg)
+            while now() < deadline:
+                nav = get_nav_offset(scr_reg)
                 compass_conf = nav.get('compass_conf', 0.0)
                 nav_conf = nav.get('nav_conf', 0.0)
-                elapsed = time.time() - start_time
+                elapsed = now() - start_time
                 
                 # Log compass state periodically (every ~1s)
                 if elapsed - last_nav_log >= 1.0:
-                    logger.debug(f"Escape heading: y={nav['y']:.2f} z={nav['z']:.1f} "
-                                f"conf={compass_conf:.2f}/{nav_conf:.2f} elapsed={elapsed:.1f}s")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Escape heading: y=%.2f z=%.1f conf=%.2f/%.2f elapsed=%.1fs",
+                                     nav['y'], nav['z'], compass_conf, nav_conf, elapsed)
                     last_nav_log = elapsed
                 
-                # Check compass reliability
-                if compass_conf > COMPASS_CONFIDENCE_THRESHOLD and nav_conf > NAVPOINT_CONFIDENCE_THRESHOLD:
-                    # Check if pip is at bottom of compass (y near -1.0)
-                    y_ok = nav['y'] <= -edge_threshold
-                    
-                    # Check if pip is behind (hollow marker, z < 0) - optional
-                    z_ok = (nav['z'] < 0) if require_behind else True
-                    
-                    # Only exit if we've also met minimum pitch time
-                    if y_ok and z_ok and elapsed >= min_pitch:
-                        logger.info(f"Escape heading acquired: y={nav['y']:.2f} z={nav['z']:.1f} "
-                                   f"conf={compass_conf:.2f}/{nav_conf:.2f} (elapsed={elapsed:.1f}s)")
-                        gate_satisfied = True
-                        break
+                # Exit once the compass is reliable, the pip is at the bottom of the compass
+                # (y near -1.0), optionally behind (hollow marker, z < 0), and we have met the
+                # minimum pitch time
+                if (compass_conf > COMPASS_CONFIDENCE_THRESHOLD and nav_conf > NAVPOINT_CONFIDENCE_THRESHOLD
+                        and nav['y'] <= -edge_threshold
+                        and (not require_behind or nav['z'] < 0)
+                        and elapsed >= min_pitch):
+                    logger.info(f"Escape heading acquired: y={nav['y']:.2f} z={nav['z']:.1f} "
+                               f"conf={compass_conf:.2f}/{nav_conf:.2f} (elapsed={elapsed:.1f}s)")
+                    gate_satisfied = True
+                    break
                 
-                time.sleep(0.1)
+                # Returns True as soon as cancel() is called
+                if cancel_wait(0.1):
+                    break
         finally:
             self.ap.keys.send('PitchUpButton', state=0)  # Release
         
-        duration = time.time() - start_time
+        duration = now() - start_time
         
         if not gate_satisfied:
             logger.warning(f"Escape heading: compass gate timed out after {duration:.1f}s")
@@ -185,16 +241,18 @@ class SupercruiseAvoidance:
 
         # Phase 2: Acquire Escape Heading (replaces simple pitch)
         success, pitch_duration = self._acquire_escape_heading(scr_reg)
+        if self._cancel.is_set():
+            return False
         if not success:
             # Compass was unreliable - use fallback
             self._fallback_escape(scr_reg)
             pitch_duration = 3.0  # Approximate duration for fallback maneuver
         
-        logger.debug(f"SupercruiseAvoidance: Escape heading phase complete ({pitch_duration:.2f}s)")
+        logger.debug("SupercruiseAvoidance: Escape heading phase complete (%.2fs)", pitch_duration)
         
         # Phase 3: Yaw Drift (Optional, for retries to try different escape vector)
         if yaw_drift_deg > 0:
-            logger.debug(f"SupercruiseAvoidance: Yawing {yaw_drift_deg} deg")
+            logger.debug("SupercruiseAvoidance: Yawing %s deg", yaw_drift_deg)
             self.ap.yawRight(yaw_drift_deg)
 
         # Phase 4: Fly Away - GUARANTEED DURATION
@@ -202,13 +260,15 @@ class SupercruiseAvoidance:
         # The purpose is to create distance from the obstructing body
         logger.info(f"SupercruiseAvoidance: Flying away for {duration}s (guaranteed)")
         self.ap.keys.send('SetSpeed100')
-        start_flight = time.time()
+
+        is_path_clear = self._is_path_clear
+        interdiction_check = self.ap.interdiction_check
         
         maneuver_aborted = False
 
-        while (time.time() - start_flight) < duration:
+        def fly_away_check() -> bool:
             # Safety check: Star ahead (we must avoid)
-            if not self._is_path_clear(scr_reg):
+            if not is_path_clear(scr_reg):
                 logger.warning('SupercruiseAvoidance: Star detected during fly-away! Pitching up to avoid.')
                 self.ap.ap_ckb('log', 'Star detected, pitching up')
                 
@@ -220,14 +280,16 @@ class SupercruiseAvoidance:
                 # Do NOT abort - continue the fly-away to ensure we distance from the original occlusion
             
             # Safety check: Interdiction
-            if self.ap.interdiction_check():
+            if interdiction_check():
                 logger.warning('SupercruiseAvoidance: Interdicted during fly-away')
-                return True  # Interdiction handled, exit
+                return True
             
             # NOTE: We do NOT check is_destination_occluded() here
             # The fly-away must complete to ensure we've moved into empty space
-            
-            time.sleep(1)
+            return False
+
+        if self._interruptible_wait(duration, poll=1.0, check_fn=fly_away_check):
+            return True  # Interdiction handled, exit
 
         # If aborted due to star, recovery routine
         if maneuver_aborted:
@@ -257,7 +319,7 @@ class SupercruiseAvoidance:
             pitch_rate = 10.0
         deg_to_pitch_down = pitch_duration * pitch_rate
         
-        logger.debug(f"SupercruiseAvoidance: Pitching back down approx {deg_to_pitch_down:.1f} deg")
+        logger.debug("SupercruiseAvoidance: Pitching back down approx %.1f deg", deg_to_pitch_down)
         self.ap.pitchDown(deg_to_pitch_down)
         
         # Reverse yaw drift
@@ -291,6 +353,8 @@ class SupercruiseAvoidance:
         Returns:
             bool: True if obstruction was cleared, False otherwise
         """
+        self._cancel.clear()
+
         # ============ SAFETY GUARD ============
         # If the solid destination circle is visible, abort avoidance (false trigger)
         dest_offset = self.ap.get_destination_offset(scr_reg)
@@ -299,11 +363,12 @@ class SupercruiseAvoidance:
             self.ap.ap_ckb('log', 'Avoidance aborted: Target visible')
             return True  # Treat as "cleared" to prevent retry loops
         
-        max_attempts = self.ap.config.get('SupercruiseAvoidanceMaxAttempts', 3)
-        base_duration = self.ap.config.get('SupercruiseAvoidanceDurationBase', 60)
-        duration_max = self.ap.config.get('SupercruiseAvoidanceDurationMax', 120)
-        yaw_increment = self.ap.config.get('SupercruiseAvoidanceYawDegrees', 15)
-        hard_escape_seconds = self.ap.config.get('SupercruiseAvoidanceHardEscapeSeconds', 120)
+        self.reload_config()
+        max_attempts = self._max_attempts
+        base_duration = self._base_duration
+        duration_max = self._duration_max
+        yaw_increment = self._yaw_increment
+        hard_escape_seconds = self._hard_escape_seconds
 
         logger.info(f'SupercruiseAvoidance: Starting avoidance sequence (Max Attempts: {max_attempts})')
         self.ap.ap_ckb('log+vce', 'Target occluded, avoiding')
@@ -317,6 +382,9 @@ class SupercruiseAvoidance:
             yaw = 0 if i == 0 else yaw_increment
             
             success = self._attempt_maneuver(scr_reg, duration, yaw, i)
+            if self._cancel.is_set():
+                logger.info("SupercruiseAvoidance: Cancelled")
+                return False
             if success:
                 self.ap.ap_ckb('log+vce', 'Obstruction cleared')
                 return True
@@ -327,6 +395,9 @@ class SupercruiseAvoidance:
         
         # Hard escape: Long duration, larger yaw drift
         self._attempt_maneuver(scr_reg, hard_escape_seconds, yaw_increment * 1.5, 99, is_hard_escape=True)
+        if self._cancel.is_set():
+            logger.info("SupercruiseAvoidance: Cancelled")
+            return False
         
         self.ap.ap_ckb('log+vce', 'Avoidance Sequence Complete')
         return True
@@ -1,7 +1,10 @@
 import unittest
+
 from OCR import OCR
 from Screen import *
 
+import cv2
+
 
 def dummy_cb(msg, body=None):
     pass
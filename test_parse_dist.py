@@ -1,42 +1,57 @@
 
-from re import search
+import re
+
+# Number (float) followed by a distance unit. Compiled once, as this is called for each OCR result.
+_DIST_RE = re.compile(r"([\d.]+)\s*(Mm|km|m|ls)")
+# Multiplier to convert each unit to kilometers. 'ls' is rough, though docking via LS is unlikely.
+_UNIT_MUL = {'Mm': 1000.0, 'km': 1.0, 'm': 0.001, 'ls': 299792.0}
+# Unit suffixes for the fast path, 'm' last so it does not shadow 'Mm' and 'km'.
+_SUFFIXES = (('Mm', 1000.0), ('km', 1.0), ('ls', 299792.0), ('m', 0.001))
+
+
+def _to_km(val_str: str, mul: float) -> float | None:
+    """ Converts the number part of a distance to kilometers. """
+    # Clean up common OCR errors
+    val_str = val_str.replace("..", ".")
+
+    try:
+        return float(val_str) * mul
+    except ValueError:
+        print(f"Failed to parse float: {val_str}")
+        return None
+
 
 def parse_distance(text: str) -> float | None:
     """ Parses a distance string like '7.5km', '1.2Mm', '800m'. 
         Returns distance in kilometers.
     """
-    # Regex to find number followed by unit
+    # Fast path, the distance is normally the only number, at the end of the OCR text
     # Examples: "Coriolis [8.2km]", "Station 1.2Mm"
-    # Match number (float) and unit
-    match = search(r"([\d\.]+)\s*(Mm|km|m|ls)", text)
+    tail = text.rstrip(" ])")
+    for suffix, mul in _SUFFIXES:
+        if tail.endswith(suffix):
+            head, _, val_str = tail[:-len(suffix)].rstrip().rpartition(" ")
+            val_str = val_str.lstrip("[(")
+            # Only when no other digit comes before it, otherwise the regex must find the first distance
+            if val_str.replace(".", "").isdigit() and not any(c.isdigit() for c in head):
+                return _to_km(val_str, mul)
+            break
+
+    # Otherwise search anywhere in the text for a number (float) followed by a unit
+    match = _DIST_RE.search(text)
     if match:
-        val_str = match.group(1)
-        unit = match.group(2)
-        
-        # Clean up common OCR errors
-        if ".." in val_str:
-            val_str = val_str.replace("..", ".")
-        
-        try:
-            value = float(val_str)
-            
-            if unit == 'Mm':
-                return value * 1000.0
-            elif unit == 'km':
-                return value
-            elif unit == 'm':
-                return value / 1000.0
-            elif unit == 'ls':
-                return value * 299792.0 # roughly, though docking via LS is unlikely
-        except ValueError:
-            print(f"Failed to parse float: {val_str}")
-            return None
+        # The regex only matches units in the table
+        return _to_km(match.group(1), _UNIT_MUL[match.group(2)])
     
     return None
 
 # Test cases
 print(f"7.5km -> {parse_distance('7.5km')}")
 print(f"4..5km -> {parse_distance('4..5km')}")
+# The first distance in the text is used
+print(f"8.2km 3m -> {parse_distance('8.2km 3m')}")
+print(f"12 km [3m] -> {parse_distance('12 km [3m]')}")
+print(f"A 2m 7km -> {parse_distance('A 2m 7km')}")
 
 
 